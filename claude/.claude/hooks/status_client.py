@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+status_client.py
+Clawed Code Hook Entry Point
+
+Minimal hook script: forwards the event to status_daemon.py over its Unix socket
+and exits, without importing status_writer.py. Only when no daemon acknowledges
+the event is status_writer.py loaded to handle it in-process (starting a daemon
+for the hooks that follow when none is listening, or the running one is outdated).
+
+Usage:
+    python3 status_client.py <event_type>
+"""
+
+import os
+import sys
+import time
+
+# The C socket module: the `socket` wrapper pulls in enum and selectors, which
+# costs several ms per hook; this script only needs the raw calls
+import _socket
+
+
+# Wire protocol version; also part of the socket name, so daemons speaking an
+# older protocol never receive requests they would misread
+PROTOCOL = "clawed-status/3"
+
+# Unix socket served by status_daemon.py
+STATUS_SOCKET = os.path.expanduser("~/.clawed-code/status-3.sock")
+
+# Events status_writer.STATUS_MAP tracks; anything else exits before reading stdin
+HOOK_EVENTS = frozenset((
+    'PreToolUse',
+    'PostToolUse',
+    'Notification',
+    'Stop',
+    'SessionStart',
+    'SessionEnd'
+))
+
+# At most this much of the payload is read up front and sent to the daemon;
+# same as status_writer.STDIN_READ_LIMIT, which this script must not import
+STDIN_READ_LIMIT = 65536
+
+# How long a hook waits on the daemon before handling the event itself (seconds)
+DAEMON_TIMEOUT_SECONDS = 2
+
+# The daemon drops a request it gets to later than this after it was sent
+# (seconds); well under DAEMON_TIMEOUT_SECONDS, so a stale event never lands
+# after the client has given up and handled it itself
+DAEMON_APPLY_SECONDS = 1
+
+
+def forward_to_daemon(event_type, raw):
+    """
+    Send the event to the daemon and return its reply.
+
+    Request: "<PROTOCOL> <event_type> <deadline>\\n<hook JSON payload>", then the
+    write side is shut down. The daemon answers "ok\\n" once the event is applied; anything
+    else means it was not handled. Returns None if no daemon is listening.
+    """
+    client = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    client.settimeout(DAEMON_TIMEOUT_SECONDS)
+    try:
+        client.connect(STATUS_SOCKET)
+    except OSError:
+        client.close()
+        return None
+
+    try:
+        deadline = time.time() + DAEMON_APPLY_SECONDS
+        client.sendall(f"{PROTOCOL} {event_type} {deadline}\n".encode('utf-8') + raw)
+        client.shutdown(_socket.SHUT_WR)
+
+        reply = b''
+        while True:
+            chunk = client.recv(64)
+            if not chunk:
+                return reply
+            reply += chunk
+    except OSError:
+        return b''
+    finally:
+        client.close()
+
+
+def start_daemon():
+    """Launch status_daemon.py detached; it serves every later hook of every session."""
+    import subprocess
+
+    daemon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'status_daemon.py')
+    try:
+        subprocess.Popen(
+            [sys.executable, daemon_path],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+    except Exception as e:
+        print(f"⚠️ Could not start status daemon: {e}", file=sys.stderr)
+
+
+def main():
+    """Main entry point for hook script."""
+    if len(sys.argv) < 2:
+        print("Usage: status_client.py <event_type>", file=sys.stderr)
+        sys.exit(1)
+
+    event_type = sys.argv[1]
+
+    # Bail out before touching stdin for events we don't track
+    if event_type not in HOOK_EVENTS:
+        print(f"⚠️ Unknown event type: {event_type}", file=sys.stderr)
+        return
+
+    # Large payloads (e.g. PostToolUse with a big tool_response) only send their
+    # head; the daemon picks the fields it needs from it or declines
+    raw = b'' if sys.stdin.isatty() else sys.stdin.buffer.read(STDIN_READ_LIMIT)
+
+    # Fast path: the daemon applies the event. An empty payload is handled
+    # locally, since only this process sees the hook's environment
+    if raw.strip():
+        reply = forward_to_daemon(event_type, raw)
+        if reply == b"ok\n":
+            # Drain the rest unread, so the writer doesn't see a broken pipe
+            if len(raw) == STDIN_READ_LIMIT:
+                while sys.stdin.buffer.read(STDIN_READ_LIMIT):
+                    pass
+            return
+
+        # None listening (idle exit, crash, first session) or running outdated
+        # code: start one for the hooks that follow
+        if reply is None or reply == b"restart\n":
+            start_daemon()
+
+    # Daemon missing, outdated, failed or too slow (it drops the request past
+    # its deadline): handle the event ourselves, reading the rest of a large
+    # payload if its head wasn't enough
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import status_writer
+
+    status_writer.handle_raw_event(event_type, status_writer.read_hook_input(raw))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+status_daemon.py
+Clawed Code Status Daemon
+
+Long-running companion to status_writer.py. Hooks run status_client.py, which
+forwards each event over a Unix socket; this process applies it with
+status_writer.py already loaded, so a hook never imports the full handler.
+
+Started automatically by status_client.py whenever a hook finds no daemon
+listening; exits on its own after IDLE_EXIT_SECONDS without any events, or as
+soon as its source files change on disk (e.g. after a dotfiles pull).
+
+Usage:
+    python3 status_daemon.py
+
+Protocol (one event per connection):
+    client sends "<PROTOCOL> <event_type> <deadline>\\n<hook JSON payload>" (at
+    most STDIN_READ_LIMIT bytes of it) and shuts down writing. Daemon replies
+    "ok\\n" once the event is applied, "late\\n" if it got to the request after
+    the deadline (the client may have timed out and handled it already),
+    "partial\\n" if the fields it needs aren't in a truncated payload,
+    "restart\\n" if its code is outdated, or "error\\n"; the client handles
+    anything but "ok" itself.
+"""
+
+import sys
+import os
+import socket
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import status_client
+import status_writer
+
+
+# Exit after this long without any hook events (seconds)
+IDLE_EXIT_SECONDS = 600
+
+# Upper bound for reading a single client request (seconds)
+CLIENT_TIMEOUT_SECONDS = 5
+
+# Code this process has loaded; if any of it changes, the daemon is outdated
+SOURCE_FILES = tuple(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    for name in ('status_daemon.py', 'status_client.py', 'status_writer.py')
+)
+
+
+def source_mtimes():
+    """Get the modification times of SOURCE_FILES (None for a missing file)."""
+    mtimes = []
+    for path in SOURCE_FILES:
+        try:
+            mtimes.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return mtimes
+
+
+def bind_socket(socket_path):
+    """
+    Bind the listening socket, clearing a stale one left by a dead daemon.
+
+    Returns None if another daemon is already serving the socket.
+    """
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+        return None
+    except FileNotFoundError:
+        pass
+    except ConnectionRefusedError:
+        os.unlink(socket_path)
+    finally:
+        probe.close()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        server.bind(socket_path)
+    except OSError:
+        # Lost a startup race with another daemon
+        server.close()
+        return None
+    server.listen()
+    return server
+
+
+def close_server(server, bound_inode):
+    """Stop listening and remove the socket file, unless a successor now owns the path."""
+    server.close()
+    try:
+        if os.stat(status_client.STATUS_SOCKET).st_ino == bound_inode:
+            os.unlink(status_client.STATUS_SOCKET)
+    except FileNotFoundError:
+        pass
+
+
+def read_request(conn):
+    """Read a whole request; the client signals the end by shutting down writing."""
+    chunks = []
+    while True:
+        chunk = conn.recv(65536)
+        if not chunk:
+            return b''.join(chunks)
+        chunks.append(chunk)
+
+
+def handle_request(request):
+    """Apply the event carried by one request and return the reply to send."""
+    try:
+        header, _, payload = request.partition(b'\n')
+        protocol, _, fields = header.decode('utf-8').partition(' ')
+        if protocol != status_client.PROTOCOL:
+            print(f"⚠️ Unsupported protocol: {protocol}", file=sys.stderr)
+            return b"error\n"
+
+        # Never apply an event after its client may have handled it: an older
+        # PreToolUse must not overwrite a newer "completed"/"needs_input"
+        event_type, _, deadline = fields.partition(' ')
+        if time.time() > float(deadline):
+            print(f"⏰ Request past its deadline, skipping: {event_type}", file=sys.stderr)
+            return b"late\n"
+
+        # Only the head of a large payload is sent; without the fields in it,
+        # the client parses the whole payload itself
+        truncated = len(payload) >= status_writer.STDIN_READ_LIMIT
+        if truncated and status_writer.pick_hook_fields(payload) is None:
+            return b"partial\n"
+        status_writer.handle_raw_event(event_type, payload)
+        return b"ok\n"
+    except Exception as e:
+        print(f"❌ Error handling event: {e}", file=sys.stderr)
+        return b"error\n"
+
+
+def serve(server, bound_inode):
+    """
+    Handle connections one at a time until idle for IDLE_EXIT_SECONDS.
+
+    If the source files changed since startup, the socket is released first and
+    the pending client is told to restart, so it handles its event itself and
+    starts a daemon running the new code.
+    """
+    loaded_mtimes = source_mtimes()
+    server.settimeout(IDLE_EXIT_SECONDS)
+    while True:
+        try:
+            conn, _ = server.accept()
+        except socket.timeout:
+            print("💤 Idle timeout, shutting down", file=sys.stderr)
+            return
+        with conn:
+            conn.settimeout(CLIENT_TIMEOUT_SECONDS)
+            try:
+                # Read the request in full even when not handling it: closing with
+                # unread data resets the connection and the client loses the reply
+                request = read_request(conn)
+
+                if source_mtimes() != loaded_mtimes:
+                    print("🔄 Source changed, shutting down", file=sys.stderr)
+                    close_server(server, bound_inode)
+                    conn.sendall(b"restart\n")
+                    return
+
+                conn.sendall(handle_request(request))
+            except OSError as e:
+                print(f"⚠️ Client connection failed: {e}", file=sys.stderr)
+
+
+def main():
+    """Main entry point for the daemon."""
+    status_writer.ensure_directories()
+
+    server = bind_socket(status_client.STATUS_SOCKET)
+    if server is None:
+        print("⚠️ Status daemon already running", file=sys.stderr)
+        return
+
+    # Remember which socket file is ours, so exiting never removes a successor's
+    bound_inode = os.stat(status_client.STATUS_SOCKET).st_ino
+
+    try:
+        serve(server, bound_inode)
+    finally:
+        close_server(server, bound_inode)
+
+
+if __name__ == '__main__':
+    main()
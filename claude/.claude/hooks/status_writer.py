@@ -4,7 +4,9 @@ status_writer.py
 Clawed Code Hook Script (Multi-Instance Version)
 
 Writes Claude Code status updates to per-session JSON files for multi-cat monitoring.
-This script is called by Claude Code hooks at various lifecycle events.
+Hooks call status_client.py, which forwards events to status_daemon.py and
+only falls back to this module when no daemon handles them. Running this script
+directly handles the event in-process.
 
 Usage:
     python3 status_writer.py <event_type>
@@ -15,25 +17,59 @@ Event types:
     - Notification: When Claude needs user input (filters out idle_prompt)
     - Stop: When the main agent completes (writes "completed" status)
     - SessionStart: When a new session starts
-    - SessionEnd: When a session ends (DELETES session file)
+    - SessionEnd: When a session ends (DELETES session file and sidecars)
 """
 
-import json
 import sys
 import os
 import time
-from datetime import datetime
+
+# orjson is noticeably faster and works on bytes in both directions; it is
+# imported once by the long-lived daemon, so its import cost isn't paid per hook.
+# Fall back to the stdlib with the same compact, bytes-returning interface
+try:
+    from orjson import loads as json_loads, dumps as json_dumps
+except ImportError:
+    import json
+
+    json_loads = json.loads
+
+    def json_dumps(obj):
+        """Serialize obj as compact UTF-8 JSON bytes."""
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
 
 
 # Sessions directory for multi-instance support
 SESSIONS_DIR = os.path.expanduser("~/.clawed-code/sessions")
 
-# Legacy single-file path (for backwards compatibility)
+# Prefix for per-session files, so paths are built with a plain f-string
+SESSIONS_DIR_PREFIX = SESSIONS_DIR + os.sep
+
+# Legacy single-file path (for backwards compatibility); a symlink to the newest session file
 LEGACY_STATUS_FILE = os.path.expanduser("~/.clawed-code/status.json")
 
+# Map event types to status
+STATUS_MAP = {
+    'PreToolUse': 'working',
+    'PostToolUse': 'working',
+    'Notification': 'needs_input',
+    'Stop': 'completed',
+    'SessionStart': 'idle',
+    'SessionEnd': 'idle'
+}
+
+# Hook payloads are read up to this many bytes; beyond it only HOOK_FIELDS are kept
+STDIN_READ_LIMIT = 65536
+
+# Payload fields this script uses (all strings near the top of the payload)
+HOOK_FIELDS = ('session_id', 'cwd', 'transcript_path', 'tool_name', 'notification_type')
+
 # Initialization phase threshold (seconds)
 INIT_PHASE_SECONDS = 15
 
+# Repeat writes of an unchanged status within this window are coalesced (seconds)
+DEBOUNCE_SECONDS = 0.1
+
 
 def is_initialization_phase(session_id):
     """
@@ -42,21 +78,52 @@ def is_initialization_phase(session_id):
     Claude Code 2.1+ runs automatic file discovery (Glob, Bash) at startup.
     During this phase, PreToolUse should be ignored so the app stays at "idle"
     until the user actually sends a message.
+
+    The session file is replaced on every write, so its creation time is
+    not stable; the age is taken from the start marker written on SessionStart.
     """
-    file_path = get_session_file_path(session_id)
-    if os.path.exists(file_path):
-        # Use st_birthtime on macOS for actual file creation time
-        # (getctime returns metadata change time on Unix)
+    file_path = get_start_file_path(session_id)
+    try:
         stat_info = os.stat(file_path)
-        created = getattr(stat_info, 'st_birthtime', stat_info.st_mtime)
-        age = time.time() - created
-        return age < INIT_PHASE_SECONDS
-    return False
+    except FileNotFoundError:
+        return False
+
+    # Use st_birthtime on macOS for actual file creation time
+    # (getctime returns metadata change time on Unix)
+    created = getattr(stat_info, 'st_birthtime', stat_info.st_mtime)
+    age = time.time() - created
+    return age < INIT_PHASE_SECONDS
 
 
 def get_session_file_path(session_id):
     """Get path to session-specific status file."""
-    return os.path.join(SESSIONS_DIR, f"{session_id}.json")
+    return f"{SESSIONS_DIR_PREFIX}{session_id}.json"
+
+
+def get_title_file_path(session_id):
+    """Get path to the session's cached title sidecar."""
+    return f"{SESSIONS_DIR_PREFIX}{session_id}.title"
+
+
+def get_start_file_path(session_id):
+    """Get path to the session's start marker (its creation time is the session start)."""
+    return f"{SESSIONS_DIR_PREFIX}{session_id}.started"
+
+
+def mark_session_started(session_id):
+    """Create the start marker, leaving an existing one (and its timestamps) untouched."""
+    try:
+        os.close(os.open(get_start_file_path(session_id), os.O_WRONLY | os.O_CREAT, 0o644))
+    except Exception as e:
+        print(f"⚠️ Could not mark session start: {e}", file=sys.stderr)
+
+
+def utc_timestamp():
+    """Current UTC time as ISO 8601 with microseconds and a Z suffix."""
+    seconds, micros = divmod(time.time_ns() // 1000, 1_000_000)
+    tm = time.gmtime(seconds)
+    return (f"{tm.tm_year:04d}-{tm.tm_mon:02d}-{tm.tm_mday:02d}"
+            f"T{tm.tm_hour:02d}:{tm.tm_min:02d}:{tm.tm_sec:02d}.{micros:06d}Z")
 
 
 def ensure_directories():
@@ -75,151 +142,352 @@ def extract_title_from_transcript(transcript_path, max_length=100):
     Returns:
         The first user prompt, truncated to max_length, or "New Session" if not found
     """
-    if not transcript_path or not os.path.exists(transcript_path):
+    if not transcript_path:
         return "New Session"
 
     try:
-        with open(transcript_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                try:
-                    msg = json.loads(line.strip())
-                    content = None
-
-                    # Claude Code transcript format: {"type":"user","message":{"role":"user","content":[...]}}
-                    if msg.get('type') == 'user' and 'message' in msg:
-                        nested_msg = msg.get('message', {})
-                        if nested_msg.get('role') == 'user':
-                            content = nested_msg.get('content', '')
-
-                    # Fallback: direct role check (other formats)
-                    elif msg.get('role') == 'user':
-                        content = msg.get('content', '')
-
-                    if content is not None:
-                        # Handle content that might be a list (multimodal)
-                        if isinstance(content, list):
-                            # Find text content
-                            for item in content:
-                                if isinstance(item, dict) and item.get('type') == 'text':
-                                    content = item.get('text', '')
-                                    break
-                                elif isinstance(item, str):
-                                    content = item
-                                    break
-                            else:
-                                content = ''
-
-                        if content:
-                            # Clean and truncate
-                            content = content.strip()
-                            if len(content) > max_length:
-                                return content[:max_length-3] + "..."
-                            return content if content else "New Session"
-                except json.JSONDecodeError:
+        # Binary mode: no per-line UTF-8 decode, and we stop at the first user message
+        with open(transcript_path, 'rb', buffering=65536) as f:
+            for raw in f:
+                if not raw.strip():
                     continue
+
+                msg = json_loads(raw)
+                content = None
+
+                # Claude Code transcript format: {"type":"user","message":{"role":"user","content":[...]}}
+                if msg.get('type') == 'user' and 'message' in msg:
+                    nested_msg = msg.get('message', {})
+                    if nested_msg.get('role') == 'user':
+                        content = nested_msg.get('content', '')
+
+                # Fallback: direct role check (other formats)
+                elif msg.get('role') == 'user':
+                    content = msg.get('content', '')
+
+                if content is not None:
+                    # Handle content that might be a list (multimodal)
+                    if isinstance(content, list):
+                        # Find text content
+                        for item in content:
+                            if isinstance(item, dict) and item.get('type') == 'text':
+                                content = item.get('text', '')
+                                break
+                            elif isinstance(item, str):
+                                content = item
+                                break
+                        else:
+                            content = ''
+
+                    if content:
+                        # Clean and truncate
+                        content = content.strip()
+                        if len(content) > max_length:
+                            return content[:max_length-3] + "..."
+                        return content if content else "New Session"
+    except FileNotFoundError:
+        pass
     except Exception as e:
         print(f"⚠️ Could not extract title: {e}", file=sys.stderr)
 
     return "New Session"
 
 
-def write_session_status(session_id, status_type, data):
+def read_cached_title(session_id):
+    """Read the session title from its sidecar file, or None if not cached yet."""
+    try:
+        with open(get_title_file_path(session_id), 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def write_cached_title(session_id, title):
+    """Cache the session title in a sidecar file so later hooks skip the transcript."""
+    try:
+        write_atomic(get_title_file_path(session_id), title.encode('utf-8'))
+    except Exception as e:
+        print(f"⚠️ Could not cache title: {e}", file=sys.stderr)
+
+
+def read_status_field(file_path, key, limit=1024):
     """
-    Write status update to session-specific file.
+    Pull a top-level string field out of a status file without parsing all of it.
 
-    Args:
-        session_id: Unique session identifier
-        status_type: One of 'idle', 'working', 'needs_input', 'completed'
-        data: Dict containing cwd, transcript_path, etc.
+    Relies on the compact layout write_status_file() produces ("key":"value");
+    returns None if the field is missing, not a string, or past the first `limit` bytes.
     """
-    ensure_directories()
-    file_path = get_session_file_path(session_id)
+    with open(file_path, 'rb') as f:
+        return find_string_field(f.read(limit), key)
+
+
+def find_string_field(head, key):
+    """
+    Find the first "key":"value" pair in a compact JSON prefix and decode the value.
+
+    Returns None if the key isn't there or its value is cut off by the end of `head`.
+    """
+    marker = b'"' + key.encode('utf-8') + b'":"'
+    start = head.find(marker)
+    if start < 0:
+        return None
+    start += len(marker)
+
+    # Find the closing quote, skipping escaped ones (odd run of backslashes)
+    end = head.find(b'"', start)
+    while end >= 0:
+        backslashes = end - len(head[start:end].rstrip(b'\\')) - start
+        if backslashes % 2 == 0:
+            return json_loads(b'"' + head[start:end] + b'"')
+        end = head.find(b'"', end + 1)
+    return None
+
+
+def is_duplicate_write(file_path, status_type):
+    """
+    Check if file_path was written within DEBOUNCE_SECONDS with the same status.
+
+    PreToolUse and PostToolUse bracket every tool call with identical "working"
+    writes, so back-to-back quick tools would otherwise rewrite the file repeatedly.
+    """
+    try:
+        if time.time() - os.stat(file_path).st_mtime >= DEBOUNCE_SECONDS:
+            return False
+        return read_status_field(file_path, "status") == status_type
+    except (OSError, ValueError):
+        return False
+
+
+def resolve_title(session_id, event_type, transcript_path):
+    """
+    Get the session title, scanning the transcript at most twice per session.
+
+    SessionStart scans once (a resumed session already has a prompt) but only
+    caches a real title. A fresh session has no prompt yet, so the first later
+    event scans again and caches whatever it finds, default included; from then
+    on the sidecar is final and the transcript is never read again.
+    """
+    # Cached title from the sidecar is a single tiny read (no JSON, no transcript)
+    title = read_cached_title(session_id)
+    if title is not None:
+        return title
 
-    # Extract title from transcript (or use cached title from existing file)
     title = "New Session"
-    transcript_path = data.get("transcript_path")
+    file_path = get_session_file_path(session_id)
 
-    # Try to read existing title first (avoid re-reading transcript every time)
-    if os.path.exists(file_path):
-        try:
-            with open(file_path, 'r') as f:
-                existing = json.load(f)
-                title = existing.get("title", "New Session")
-        except:
-            pass
+    # Sessions started before the sidecar existed keep their title in the status file
+    # (opening it doubles as the existence check)
+    try:
+        title = read_status_field(file_path, "title") or "New Session"
+    except (OSError, ValueError):
+        pass
 
-    # On SessionStart or if title is still default, extract from transcript
     if title == "New Session" and transcript_path:
         title = extract_title_from_transcript(transcript_path)
 
-    # Build session data
-    session_data = {
+    if title != "New Session" or event_type != 'SessionStart':
+        write_cached_title(session_id, title)
+
+    return title
+
+
+def build_session_data(session_id, status_type, data, event_type):
+    """
+    Build the status payload for a session-specific file.
+
+    Args:
+        session_id: Unique session identifier
+        status_type: One of 'idle', 'working', 'needs_input', 'completed'
+        data: Dict containing cwd, transcript_path, etc.
+        event_type: Hook event being handled (decides whether the title may be scanned)
+    """
+    transcript_path = data.get("transcript_path")
+
+    return {
         "session_id": session_id,
         "status": status_type,
-        "title": title,
+        "title": resolve_title(session_id, event_type, transcript_path),
         "cwd": data.get("cwd", ""),
         "transcript_path": transcript_path,
-        "timestamp": datetime.utcnow().isoformat() + "Z"
+        "timestamp": utc_timestamp(),
+        # Legacy schema fields, so status.json can simply point at this file
+        "tool": data.get("tool_name"),
+        "session": session_id
     }
 
-    # Write atomically to file
+
+def write_atomic(file_path, payload):
+    """
+    Replace file_path with payload via a temp file and rename.
+
+    Readers never see a half-written file. There is deliberately no fsync:
+    status files are rewritten constantly and losing one on power loss is fine.
+    """
+    tmp_path = f"{file_path}.tmp.{os.getpid()}"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        try:
+            os.write(fd, payload)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        # Don't leave the temp file behind (e.g. a failed write on a full disk)
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_status_file(file_path, status):
+    """Serialize status compactly and write it to file_path with a single write()."""
+    write_atomic(file_path, json_dumps(status))
+
+
+def write_session_status(session_id, session_data):
+    """Write a prebuilt payload to the session-specific file."""
     try:
-        with open(file_path, 'w') as f:
-            json.dump(session_data, f, indent=2)
-        print(f"✅ Session status updated: {session_id} -> {status_type}", file=sys.stderr)
+        write_status_file(get_session_file_path(session_id), session_data)
+        print(f"✅ Session status updated: {session_id} -> {session_data['status']}", file=sys.stderr)
     except Exception as e:
         print(f"❌ Error writing session status: {e}", file=sys.stderr)
 
 
+def link_legacy_status(session_id):
+    """
+    Point the legacy status file at this session's file via a symlink.
+
+    Done once per session, so legacy readers follow the newest session
+    without a second write on every hook.
+    """
+    tmp_path = f"{LEGACY_STATUS_FILE}.tmp.{os.getpid()}"
+    try:
+        os.symlink(get_session_file_path(session_id), tmp_path)
+        os.replace(tmp_path, LEGACY_STATUS_FILE)
+    except Exception as e:
+        print(f"⚠️ Legacy status link failed: {e}", file=sys.stderr)
+
+
 def delete_session_file(session_id):
     """Delete the session file (for Stop/SessionEnd events)."""
     file_path = get_session_file_path(session_id)
 
-    if os.path.exists(file_path):
+    try:
+        os.remove(file_path)
+        print(f"🗑️ Session file deleted: {session_id}", file=sys.stderr)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"❌ Error deleting session file: {e}", file=sys.stderr)
+
+    for sidecar_path in (get_title_file_path(session_id), get_start_file_path(session_id)):
         try:
-            os.remove(file_path)
-            print(f"🗑️ Session file deleted: {session_id}", file=sys.stderr)
+            os.remove(sidecar_path)
+        except FileNotFoundError:
+            pass
         except Exception as e:
-            print(f"❌ Error deleting session file: {e}", file=sys.stderr)
+            print(f"❌ Error deleting session sidecar: {e}", file=sys.stderr)
 
 
-def write_legacy_status(status_type, data):
-    """Write to legacy single-file for backwards compatibility."""
-    ensure_directories()
+def is_legacy_linked_to(session_id):
+    """Check if the legacy status file is currently a symlink to this session's file."""
+    try:
+        return os.readlink(LEGACY_STATUS_FILE) == get_session_file_path(session_id)
+    except OSError:
+        return False
 
+
+def write_legacy_status(status_type, data):
+    """Write to legacy single-file (no-session mode, or after its session ended)."""
     status = {
         "status": status_type,
-        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "timestamp": utc_timestamp(),
         "tool": data.get("tool_name"),
         "session": data.get("session_id")
     }
 
     try:
-        # Ensure parent directory exists
-        os.makedirs(os.path.dirname(LEGACY_STATUS_FILE), exist_ok=True)
-        with open(LEGACY_STATUS_FILE, 'w') as f:
-            json.dump(status, f, indent=2)
+        write_status_file(LEGACY_STATUS_FILE, status)
     except Exception as e:
         print(f"⚠️ Legacy status write failed: {e}", file=sys.stderr)
 
 
-def main():
-    """Main entry point for hook script."""
-    # Get event type from command line
-    if len(sys.argv) < 2:
-        print("Usage: status_writer.py <event_type>", file=sys.stderr)
-        sys.exit(1)
+def pick_hook_fields(head):
+    """
+    Pick HOOK_FIELDS out of the start of a compact hook payload.
 
-    event_type = sys.argv[1]
+    Returns None when session_id isn't found (e.g. the payload has spaces
+    after its colons), so the caller knows to parse the whole payload instead.
+    """
+    fields = {}
+    for key in HOOK_FIELDS:
+        value = find_string_field(head, key)
+        if value is not None:
+            fields[key] = value
+    return fields if "session_id" in fields else None
 
-    # Read JSON data from stdin (if available)
-    data = {}
-    if not sys.stdin.isatty():
-        try:
-            data = json.load(sys.stdin)
-        except json.JSONDecodeError:
-            print("⚠️ Could not parse JSON from stdin", file=sys.stderr)
 
+def read_hook_input(head=None):
+    """
+    Read the hook payload from stdin, parsing at most STDIN_READ_LIMIT bytes.
+
+    Large payloads (e.g. PostToolUse with a big tool_response) are reduced to
+    HOOK_FIELDS picked out of the first chunk; the rest is drained unparsed so
+    the writer doesn't see a broken pipe. If the fields can't be picked out,
+    the whole payload is returned for a full parse.
+
+    Args:
+        head: Start of the payload if the caller already read it from stdin
+              (status_client.py reads up to STDIN_READ_LIMIT bytes itself)
+    """
+    if head is None:
+        if sys.stdin.isatty():
+            return b''
+        head = sys.stdin.buffer.read(STDIN_READ_LIMIT)
+
+    if len(head) < STDIN_READ_LIMIT:
+        return head
+
+    fields = pick_hook_fields(head)
+    if fields is None:
+        return head + sys.stdin.buffer.read()
+
+    while sys.stdin.buffer.read(STDIN_READ_LIMIT):
+        pass
+    return json_dumps(fields)
+
+
+def parse_hook_payload(raw):
+    """
+    Parse a raw hook payload into a dict.
+
+    Large payloads are reduced to HOOK_FIELDS from the first STDIN_READ_LIMIT
+    bytes when possible, and fully parsed otherwise.
+    """
+    if len(raw) >= STDIN_READ_LIMIT:
+        fields = pick_hook_fields(raw[:STDIN_READ_LIMIT])
+        if fields is not None:
+            return fields
+
+    if not raw.strip():
+        return {}
+
+    try:
+        return json_loads(raw)
+    except ValueError:
+        print("⚠️ Could not parse JSON from stdin", file=sys.stderr)
+        return {}
+
+
+def handle_event(event_type, data):
+    """
+    Apply a single hook event.
+
+    Args:
+        event_type: Hook event name (see module docstring)
+        data: Parsed hook payload from stdin
+    """
     # Filter out idle_prompt notifications (false "needs input" after 60s idle)
     if event_type == 'Notification':
         # Field is "notification_type" in the payload, not just "type"
@@ -228,21 +496,11 @@ def main():
             print("⏭️ Skipping idle_prompt notification (not a real input request)", file=sys.stderr)
             return
 
-    # Map event types to status
-    status_map = {
-        'PreToolUse': 'working',
-        'PostToolUse': 'working',
-        'Notification': 'needs_input',
-        'Stop': 'completed',
-        'SessionStart': 'idle',
-        'SessionEnd': 'idle'
-    }
-
     # Get session ID from data (needed for initialization check)
     session_id = data.get("session_id")
 
     # Get mapped status
-    status_type = status_map.get(event_type, 'unknown')
+    status_type = STATUS_MAP.get(event_type)
 
     # Skip PreToolUse during initialization phase - keeps status at "idle"
     # Claude Code 2.1+ runs automatic Glob/Bash at startup before user interaction
@@ -251,26 +509,75 @@ def main():
         print(f"🚀 Initialization phase: ignoring PreToolUse (staying idle)", file=sys.stderr)
         return  # Exit early, don't write "working" status
 
-    if status_type == 'unknown':
+    if status_type is None:
         print(f"⚠️ Unknown event type: {event_type}", file=sys.stderr)
         return
 
+    # Every path below writes at least one status file; sessions dir is
+    # nested under the legacy file's directory, so this covers both
+    ensure_directories()
+
     if session_id:
         # Multi-instance mode: write to per-session file
         if event_type == 'SessionEnd':
             # Only delete on explicit session end (not completion)
             delete_session_file(session_id)
-        else:
-            # Write status (including "completed" for Stop event)
-            write_session_status(session_id, status_type, data)
 
-        # Also write legacy file for backwards compatibility
-        write_legacy_status(status_type, data)
+            # Don't leave the legacy file dangling at the deleted session
+            if is_legacy_linked_to(session_id):
+                write_legacy_status(status_type, data)
+        else:
+            # Write status (including "completed" for Stop event); the legacy
+            # file is a symlink to the newest session, set up once at start
+            if event_type == 'SessionStart':
+                mark_session_started(session_id)
+                link_legacy_status(session_id)
+
+            file_path = get_session_file_path(session_id)
+            # Leave the mtime alone so the window runs from the last real write
+            # and the file's timestamp/tool never lag more than DEBOUNCE_SECONDS
+            if is_duplicate_write(file_path, status_type):
+                print(f"⏭️ Status unchanged, skipping write: {session_id} -> {status_type}", file=sys.stderr)
+                return
+
+            write_session_status(session_id, build_session_data(session_id, status_type, data, event_type))
     else:
         # No session ID: fallback to legacy single-file mode
         print("⚠️ No session_id provided, using legacy mode", file=sys.stderr)
         write_legacy_status(status_type, data)
 
 
+def handle_raw_event(event_type, raw):
+    """
+    Apply a hook event from its raw payload.
+
+    Shared by main(), status_client.py's fallback and status_daemon.py.
+    """
+    # Bail out before parsing for events we don't track
+    if event_type not in STATUS_MAP:
+        print(f"⚠️ Unknown event type: {event_type}", file=sys.stderr)
+        return
+
+    # The payload's session_id is authoritative (an inherited CLAUDE_SESSION_ID may
+    # belong to a parent session); the environment is only a fallback for SessionEnd
+    # when there is no payload at all. status_client.py never forwards an empty
+    # payload, so this always runs in the hook's own process
+    env_session_id = os.environ.get('CLAUDE_SESSION_ID')
+    if event_type == 'SessionEnd' and env_session_id and not raw.strip():
+        raw = json_dumps({"session_id": env_session_id})
+
+    handle_event(event_type, parse_hook_payload(raw))
+
+
+def main():
+    """Main entry point when run directly (in-process, no daemon)."""
+    # Get event type from command line
+    if len(sys.argv) < 2:
+        print("Usage: status_writer.py <event_type>", file=sys.stderr)
+        sys.exit(1)
+
+    handle_raw_event(sys.argv[1], read_hook_input())
+
+
 if __name__ == '__main__':
     main()